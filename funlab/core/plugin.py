@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+import functools
 import logging
-from importlib.metadata import entry_points
+import sys
+from importlib.metadata import EntryPoint, EntryPoints, entry_points
 from flask_login import LoginManager
 from flask import Blueprint
 from .menu import Menu
@@ -14,10 +16,21 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from funlab.flaskr.app import FunlabFlask
 
+@functools.lru_cache(maxsize=None)
+def _cached_entry_points(sys_path:tuple[str, ...])->EntryPoints:
+    """ entry_points() walks metadata of every installed distribution, scan it once for all groups.
+        sys_path is part of the key so that a changed sys.path scans again.
+        Call _cached_entry_points.cache_clear() to force rescan, e.g. after plugin installed.
+    """
+    return entry_points()
+
+def _group_entry_points(group:str)->tuple[EntryPoint, ...]:
+    return tuple(_cached_entry_points(tuple(sys.path)).select(group=group))
+
 def load_plugins(group:str)->dict:
     plugins = {}
     # load dynamically, ref: https://packaging.python.org/en/latest/guides/creating-and-discovering-plugins/
-    plugin_entry_points = entry_points(group=group)
+    plugin_entry_points = _group_entry_points(group)
     for entry_point in plugin_entry_points:
         plugin_name = entry_point.name
         try:
@@ -1,24 +1,55 @@
 
-import calendar
-import math
-from datetime import date, datetime, time, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from dateutil.relativedelta import relativedelta
+import numpy as np
 import pandas as pd
 
 LOCAL_TZ = datetime.now(timezone.utc).astimezone().tzinfo
 TW_TZ = timezone(timedelta(seconds=28800), name='Asia/Taipei')
+# LOCAL_TZ is a fixed offset timezone, so conversion between utc timestamp and naive local datetime is just arithmetic
+_LOCAL_EPOCH = datetime(1970, 1, 1) + LOCAL_TZ.utcoffset(None)  # naive local datetime of utc timestamp 0
 
-def local_datetime2utc_timestamp(dt:datetime|date)->float:
+# quarter lookup tables, indexed by month (1-12) or quarter (1-4), index 0 is unused
+_QUARTER_OF_MONTH = (0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 4, 4, 4)
+_QUARTER_START_MONTH = (0, 1, 1, 1, 4, 4, 4, 7, 7, 7, 10, 10, 10)
+_QUARTER_END_MONTH = (0, 3, 3, 3, 6, 6, 6, 9, 9, 9, 12, 12, 12)
+_QUARTER_END_DAY = (0, 31, 30, 30, 31)  # last day of 3/31, 6/30, 9/30, 12/31, no leap year concern
 
-    if type(dt) == date:  # isinstance(dt, date) will be true, if dt is a datetime
-        dt = datetime.combine(dt, time=time(0, 0, 0))
-    return dt.replace(tzinfo=LOCAL_TZ).astimezone(tz=timezone.utc).timestamp()
+def local_datetime2utc_timestamp(dt:datetime|date)->float:
+    """ Naive local datetime or date to utc timestamp, tz-aware datetime also treat as local datetime.
+    """
+    if isinstance(dt, datetime):  # check before date, datetime is a date; pd.Timestamp is a datetime
+        if dt.tzinfo is not None:  # always treat as local datetime
+            dt = dt.replace(tzinfo=None)
+        return (dt - _LOCAL_EPOCH).total_seconds()
+    if isinstance(dt, date):
+        return (datetime(dt.year, dt.month, dt.day) - _LOCAL_EPOCH).total_seconds()
+    raise TypeError(f'local_datetime2utc_timestamp() argument must be datetime or date, not {type(dt).__name__}')
 
 def utc_timestamp2local_datetime(ts:float)->datetime:
-    return datetime.fromtimestamp(ts, tz=timezone.utc).astimezone(tz=LOCAL_TZ).replace(tzinfo=None)
+    return _LOCAL_EPOCH + timedelta(seconds=ts)
 
 def utc_timestamp2local_date(ts:float)->date:
-    return datetime.fromtimestamp(ts, tz=timezone.utc).astimezone(tz=LOCAL_TZ).replace(tzinfo=None).date()
+    return (_LOCAL_EPOCH + timedelta(seconds=ts)).date()
+
+def local_datetimes2utc_timestamps(dts)->np.ndarray:
+    """ Vectorized local_datetime2utc_timestamp for array-like of naive local datetime/date, e.g. list, np.ndarray, pd.Series.
+        Same as local_datetime2utc_timestamp, tz-aware datetimes also treat as local datetime. NaT/None got nan.
+    """
+    if isinstance(dts, np.ndarray) and dts.dtype.kind == 'M':  # datetime64 is always naive
+        arr = dts.astype('datetime64[ns]')
+    else:
+        dtidx = pd.DatetimeIndex(pd.to_datetime(dts))
+        if dtidx.tz is not None:
+            dtidx = dtidx.tz_localize(None)  # keep wall time, not convert to utc
+        arr = dtidx.to_numpy(dtype='datetime64[ns]')
+    return (arr - np.datetime64(_LOCAL_EPOCH, 'ns')) / np.timedelta64(1, 's')
+
+def utc_timestamps2local_datetimes(ts)->np.ndarray:
+    """ Vectorized utc_timestamp2local_datetime for array-like of utc timestamps, got datetime64[ns] array of naive local datetime.
+    """
+    ns = np.round(np.asarray(ts, dtype='float64') * 1e9).astype('int64')
+    return np.datetime64(_LOCAL_EPOCH, 'ns') + ns.astype('timedelta64[ns]')
 
 def local_timestamp2utc_timestamp(ts:float):
     return datetime.fromtimestamp(ts, tz=LOCAL_TZ).astimezone(tz=timezone.utc).timestamp()
@@ -28,7 +59,7 @@ def quarter_of_date(ddate: datetime|date, shift_quarter_count=0)->int:
     """
     if shift_quarter_count!=0:
         ddate, _ = quarter_start_end_date(ddate, shift_quarter_count)
-    return math.ceil(ddate.month / 3)
+    return _QUARTER_OF_MONTH[ddate.month]
 
 def quarter_start_end_date(fromdate:date, shift_quarter_count:int=0)->date:
     """取得傳入日期所在季度的起始及最後一天, 例 1 - 3 月間的日期, 得到1/1及 3/31
@@ -37,36 +68,44 @@ def quarter_start_end_date(fromdate:date, shift_quarter_count:int=0)->date:
         fromdate ([date]): 傳入日期, 再shift個季度後, 取得所在季度的起始及最後一天
         shift_quarter_count: 由 fromdate, 往前移shift_quarter_count<0個季度, 或往後移shift_quarter_count>0個季度, =0 即fromdate的當前季度
     """
-    quarter_year = fromdate.year
-    quarter_end_month = math.ceil(fromdate.month / 3) * 3 + shift_quarter_count * 3
-    if quarter_end_month <= 0:
-        while quarter_end_month <= 0:
-            quarter_end_month += 12
-            quarter_year -= 1
-    elif quarter_end_month > 12:
-        while quarter_end_month > 12:
-            quarter_end_month -= 12
-            quarter_year += 1
-    quarter_start_month = quarter_end_month - 2
-    quarter_start_date = date(quarter_year, quarter_start_month, day=1)
-    quarter_end_date = date(quarter_year, quarter_end_month, day=30 if quarter_end_month in (4, 6, 9, 11) else 31)
+    # 0-based quarter end month after shift, divmod carries months out of 0-11 into year
+    year_shift, quarter_end_month = divmod(_QUARTER_END_MONTH[fromdate.month] - 1 + shift_quarter_count * 3, 12)
+    quarter_year = fromdate.year + year_shift
+    quarter_end_month += 1
+    quarter_start_date = date(quarter_year, quarter_end_month - 2, day=1)
+    quarter_end_date = date(quarter_year, quarter_end_month, day=_QUARTER_END_DAY[quarter_end_month // 3])
     return quarter_start_date, quarter_end_date
 
+def quarter_start_end_dates(fromdates, shift_quarter_count:int=0)->tuple[np.ndarray, np.ndarray]:
+    """Vectorized quarter_start_end_date for array-like of dates, e.g. list, np.ndarray, pd.Series.
+        For bucketing many dated rows by quarter, calculated by month count since 1970-01 in numpy, no python loop.
+
+    Args:
+        fromdates: array-like of date/datetime, NaT/None got NaT
+        shift_quarter_count: same as quarter_start_end_date
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: datetime64[D] arrays of quarter start dates and quarter end dates
+    """
+    months = np.asarray(fromdates, dtype='datetime64[M]')
+    nat = np.isnat(months)
+    month_idx = months.astype('int64')  # 0 is 1970-01, so month_idx % 3 == 0 is the first month of a quarter
+    quarter_end_idx = month_idx - month_idx % 3 + 2 + shift_quarter_count * 3
+    start_dates = (quarter_end_idx - 2).astype('datetime64[M]').astype('datetime64[D]')
+    end_dates = (quarter_end_idx + 1).astype('datetime64[M]').astype('datetime64[D]') - np.timedelta64(1, 'D')
+    start_dates[nat] = np.datetime64('NaT')
+    end_dates[nat] = np.datetime64('NaT')
+    return start_dates, end_dates
+
 def quarter_start_date(ddate:date)->date:
-    quarter = quarter_of_date(ddate)
-    quarter_start_month = 1 if quarter == 1 else 4 if quarter == 2 else 7 if quarter == 3 else 10
-    return date(ddate.year, quarter_start_month, 1)
+    return date(ddate.year, _QUARTER_START_MONTH[ddate.month], 1)
 
 def quarter_end_date(ddate:date)->date:
-    quarter = quarter_of_date(ddate)
-    quarter_end_month = 3 if quarter == 1 else 6 if quarter == 2 else 9 if quarter == 3 else 12
-    return date(ddate.year, quarter_end_month, calendar.monthrange(ddate.year, quarter_end_month)[1])
+    return date(ddate.year, _QUARTER_END_MONTH[ddate.month], _QUARTER_END_DAY[_QUARTER_OF_MONTH[ddate.month]])
 
 def quarter_start_date2(year:int, quarter:int)->date:
-    quarter_start_month = 1 if quarter == 1 else 4 if quarter == 2 else 7 if quarter == 3 else 10
-    return date(year, quarter_start_month, 1)
+    return date(year, quarter * 3 - 2, 1)
 
 def quarter_end_date2(year:int, quarter:int)->date:
-    quarter_end_month = 3 if quarter == 1 else 6 if quarter == 2 else 9 if quarter == 3 else 12
-    return date(year, quarter_end_month, calendar.monthrange(year, quarter_end_month)[1])
+    return date(year, quarter * 3, _QUARTER_END_DAY[quarter])
 
@@ -1,15 +1,16 @@
 import dataclasses
+import functools
 import importlib
 import inspect
+import operator
+import sys
 from pathlib import Path
 
 def get_caller_module(level=1):
-    # Get the full stack
-    stack = inspect.stack()
-    # Get one level up from current
-    previous_stack_frame = stack[level]  # previous_stack_frame.filename  # Filename where caller lives
+    # Get the frame of level up from current directly, inspect.stack() builds FrameInfo with source lines for the whole stack
+    previous_stack_frame = sys._getframe(level)
     # Get the module object of the caller
-    caller_module = inspect.getmodule(previous_stack_frame[0])
+    caller_module = inspect.getmodule(previous_stack_frame)
     #print(caller_module.__file__)
     return caller_module
 
@@ -21,23 +22,35 @@ def get_package_dir(fromfile, packagename):
         raise Exception(f"Not found the packagename:{packagename}, check!")
     return rootdir
 
+_CLS_CACHE:dict[tuple[str, str], type] = {}  # (from_module, class_name) -> class, for get_class
+
 def get_class(class_name:str, from_module=None) :
     if from_module:
-        module = importlib.import_module(from_module)
-        return getattr(module, class_name)
+        key = (from_module, class_name)
+        if (cls:=_CLS_CACHE.get(key)) is None:
+            module = importlib.import_module(from_module)
+            cls = _CLS_CACHE[key] = getattr(module, class_name)
+        return cls
     else :
-        frm = inspect.stack()[1]
-        from_module = inspect.getmodule(frm[0])  # get calling from module
+        frm = sys._getframe(1)
+        from_module = inspect.getmodule(frm)  # get calling from module
         return getattr(from_module, class_name)
 
+@functools.lru_cache(maxsize=None)
+def _init_fields_getter(dataclass_cls:type):
+    """ Build once per dataclass a function to get {field name: value} of init fields from its object. """
+    names = tuple(field.name for field in dataclasses.fields(dataclass_cls) if field.init)
+    if not names:
+        return lambda obj: {}
+    getter = operator.attrgetter(*names)
+    if len(names) == 1:  # attrgetter of one name returns the value, not tuple
+        return lambda obj: {names[0]: getter(obj)}
+    return lambda obj: dict(zip(names, getter(obj)))
+
 def create_entity_from_dataclass(dataclassobj, from_module, name_ext=''):
     entityclass_name = f'{dataclassobj.__class__.__name__}{name_ext}Entity'
     entityclass = get_class(entityclass_name, from_module)
-    fields = dataclasses.fields(dataclassobj)
-    attrs = {}
-    for field in fields:
-        if field.init:
-            attrs[field.name] = getattr(dataclassobj, field.name)
+    attrs = _init_fields_getter(dataclassobj.__class__)(dataclassobj)
     entity = entityclass(**attrs)
     return entity
 
@@ -1,7 +1,12 @@
+import atexit
 import enum
+import os
+import queue
 import sys
 import logging
+import threading
 from datetime import date
+from logging.handlers import QueueHandler, QueueListener
 
 from colorama import Fore, Style, init
 
@@ -20,26 +25,92 @@ class LogFmtType(enum.IntEnum):
     LONG = 2
     BASIC = 3
 
-def get_fmtstr(fmt:LogFmtType):
-    if isinstance(fmt, LogFmtType) and fmt == LogFmtType.EMPTY:
-        fmt = ''
-        datefmt = ''
-    elif isinstance(fmt, LogFmtType) and fmt == LogFmtType.SHORT:
-        fmt = '%(asctime)s[%(name)s] %(message)s'
-        datefmt = '%Y%m%dT%H%M%S'
-    elif isinstance(fmt, LogFmtType) and fmt == LogFmtType.LONG:
-        fmt = '%(asctime)s[%(name)s] %(levelname)s: %(message)s'
-        datefmt = '%Y-%m-%d %H:%M:%S.%f'
-    elif isinstance(fmt, LogFmtType) and fmt == LogFmtType.BASIC:
-        fmt = logging.BASIC_FORMAT
-        datefmt = '%Y-%m-%d %H:%M:%S'
-    else:
-        datefmt = '%Y-%m-%d %H:%M:%S'
-
-    return fmt, datefmt
+_DEFAULT_DATEFMT = '%Y-%m-%d %H:%M:%S'
+_FMT_TABLE:dict[LogFmtType, tuple[str, str]] = {
+    LogFmtType.EMPTY: ('', ''),
+    LogFmtType.SHORT: ('%(asctime)s[%(name)s] %(message)s', '%Y%m%dT%H%M%S'),
+    LogFmtType.LONG: ('%(asctime)s[%(name)s] %(levelname)s: %(message)s', '%Y-%m-%d %H:%M:%S.%f'),
+    LogFmtType.BASIC: (logging.BASIC_FORMAT, _DEFAULT_DATEFMT),
+}
+
+# pre-baked formatMessage of the format strings in _FMT_TABLE, skip Formatter's generic %-style substitution
+# record.message and record.asctime are set by Formatter.format() before formatMessage() called
+_FMT_MESSAGE = {
+    _FMT_TABLE[LogFmtType.SHORT][0]: lambda record: f'{record.asctime}[{record.name}] {record.message}',
+    _FMT_TABLE[LogFmtType.LONG][0]: lambda record: f'{record.asctime}[{record.name}] {record.levelname}: {record.message}',
+    _FMT_TABLE[LogFmtType.BASIC][0]: lambda record: f'{record.levelname}:{record.name}:{record.message}',
+}
+
+def get_fmtstr(fmt:str | LogFmtType)->tuple[str, str]:
+    # LogFmtType is IntEnum, so raw int value also found in table; other fmt string got default datefmt
+    return _FMT_TABLE.get(fmt) or (fmt, _DEFAULT_DATEFMT)
+
+# all queued loggers put formatted records into _LOG_QUEUE, one background listener thread writes them to stream,
+# so the caller does not block on stream write and flush
+_LOG_QUEUE:queue.SimpleQueue = queue.SimpleQueue()
+_queue_listener:QueueListener = None
+_queue_listener_lock = threading.Lock()
+_queue_stopped = False  # set at exit, listener not started again
+_stream_handler:logging.Handler = None  # writes stdout records, in listener thread or directly when listener not running
+
+def _start_queue_listener():
+    global _queue_listener, _stream_handler
+    with _queue_listener_lock:
+        if _stream_handler is None:
+            _stream_handler = CustomHandler()
+        if _queue_listener is None and not _queue_stopped:
+            _queue_listener = QueueListener(_LOG_QUEUE, _stream_handler)
+            _queue_listener.start()
+
+def _stop_queue_listener():
+    # write out queued records at exit, records logged later, e.g. in other atexit hooks or __del__, are written directly
+    global _queue_listener, _queue_stopped
+    with _queue_listener_lock:
+        listener, _queue_listener = _queue_listener, None
+        _queue_stopped = True
+    if listener:
+        listener.stop()
+
+def _reset_queue_listener_in_child():
+    # listener thread is not copied into forked child, and child may exit by os._exit without atexit, e.g. multiprocessing,
+    # so child never starts a listener and always writes directly
+    global _LOG_QUEUE, _queue_listener, _queue_listener_lock, _queue_stopped
+    _queue_listener_lock = threading.Lock()  # might be held by other parent thread when fork
+    _queue_listener = None
+    _queue_stopped = True
+    _LOG_QUEUE = queue.SimpleQueue()  # parent's pending records are written by parent
+
+atexit.register(_stop_queue_listener)
+if hasattr(os, 'register_at_fork'):  # not on Windows
+    os.register_at_fork(after_in_child=_reset_queue_listener_in_child)
+
+class _ListenerQueueHandler(QueueHandler):
+    """ QueueHandler puts record into current _LOG_QUEUE, or writes it directly if the listener thread is not running. """
+    def __init__(self):
+        super().__init__(None)
+
+    def emit(self, record):
+        try:
+            if _queue_listener is not None:
+                prepared = self.prepare(record)
+                with _queue_listener_lock:  # no record put after listener stopped, which would never be written
+                    if _queue_listener is not None:
+                        _LOG_QUEUE.put_nowait(prepared)
+                        return
+            msg = self.format(record)
+            with _stream_handler.lock:  # same as CustomHandler.emit, but with this handler's formatter
+                _stream_handler.stream.write(msg + getattr(record, 'end', '\n'))
+                _stream_handler.flush()
+        except Exception:
+            self.handleError(record)
+
+# logger name -> (configuration, logger) created by get_logger, reused when get_logger called again with same configuration
+_CONFIGURED:dict[str, tuple[tuple, logging.Logger]] = {}
+# (log filename, fmt, datefmt) -> FileHandler, one opened file per log file and format
+_FILE_HANDLERS:dict[tuple[str, str, str], logging.FileHandler] = {}
 
 def get_logger(name:str, logtype:LogType=LogType.STDOUT, fmt:str | LogFmtType=LogFmtType.SHORT
-               , level=logging.ERROR, **fmtkwargs)->logging.Logger:
+               , level=logging.ERROR, use_queue=False, **fmtkwargs)->logging.Logger:
     """
     Get a colored logger with the specified configuration.
     Use ColorFormatter to log colored message based on the log level as below:
@@ -54,11 +125,18 @@ def get_logger(name:str, logtype:LogType=LogType.STDOUT, fmt:str | LogFmtType=Lo
         logtype (LogType, optional): The type of logging. Defaults to LogType.STDOUT.
         fmt (str | LogFmtType, optional): The log message format. Defaults to LogFmtType.SHORT.
         level (int, optional): The logging level. Defaults to logging.ERROR.
+        use_queue (bool, optional): Whether to write stdout log in the background listener thread through a queue,
+            written directly in forked child process. Defaults to False.
         **fmtkwargs: Additional keyword arguments for formatting the log message.
 
     Returns:
-        logging.Logger: The configured logger instance.
+        logging.Logger: The configured logger instance, the same one for the same name and configuration.
     """
+    # dated log filename in the key, so a call after midnight gets a logger writing today's file
+    filename = f'{name}_{date.today().strftime("%y%m%d")}.log' if logtype in (LogType.FILE, LogType.BOTH) else None
+    config_key = (logtype, fmt, level, use_queue, filename)
+    if (configured:=_CONFIGURED.get(name)) and configured[0] == config_key:
+        return configured[1]
     # logger = logging.getLogger(name)
     logger = CustomLogger(name)
     logger.propagate = False # disable propagate so the parent, e.g. webserver waitress, will not show my log again
@@ -67,29 +145,48 @@ def get_logger(name:str, logtype:LogType=LogType.STDOUT, fmt:str | LogFmtType=Lo
             logger.removeHandler(handler)
         except ValueError:  # in case another thread has already removed it
             pass
-    if isinstance(fmt, LogFmtType):
-        fmt, datefmt = get_fmtstr(fmt)
-    else:
-        fmt = fmt
-        datefmt = '%Y-%m-%d %H:%M:%S'
+    fmt, datefmt = get_fmtstr(fmt)
 
     if logtype == LogType.OFF:
         logger.addHandler(logging.NullHandler())
         # logger.propagate = False
     if logtype in (LogType.ON, LogType.STDOUT, LogType.BOTH):
-        handler = CustomHandler()
+        if use_queue:
+            _start_queue_listener()
+            handler = _ListenerQueueHandler()  # record is formatted by handler's formatter before put into queue
+        else:
+            handler = CustomHandler()
         handler.setFormatter(ColorFormatter(fmt=fmt, datefmt=datefmt))
         handler.setLevel(level)
         logger.addHandler(handler)
-    if logtype in (LogType.FILE, LogType.BOTH):
-        handler = logging.FileHandler(f'{name}_{date.today().strftime("%y%m%d")}.log')
-        handler.setLevel(level)
-        handler.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
+    if filename:
+        # reuse opened file for same logger name, date and format, it is shared with loggers returned before,
+        # so level is not set on it but filtered by each logger's own level
+        if (handler:=_FILE_HANDLERS.get(handler_key:=(filename, fmt, datefmt))) is None:
+            # same file with another format shares the opened stream
+            stream_owner = next((h for (fn, *_), h in _FILE_HANDLERS.items() if fn == filename and h._stream_owner is None), None)
+            handler = _FILE_HANDLERS[handler_key] = BufferedFileHandler(filename, stream_owner=stream_owner)
+            handler.setFormatter(PresetFormatter(fmt=fmt, datefmt=datefmt))
         logger.addHandler(handler)
     logger.setLevel(level)
+    _CONFIGURED[name] = (config_key, logger)
     return logger
 
-class ColorFormatter(logging.Formatter):
+class PresetFormatter(logging.Formatter):
+    """
+    A logging formatter that formats the message with pre-baked f-string for the format of LogFmtType,
+    other format string is formatted by logging.Formatter as usual.
+    """
+    def __init__(self, fmt: str=None, datefmt: str=None, **fmtkwargs):
+        super().__init__(fmt=fmt, datefmt=datefmt, **fmtkwargs)
+        self._format_message = _FMT_MESSAGE.get(self._fmt)
+
+    def formatMessage(self, record)->str:
+        if self._format_message:
+            return self._format_message(record)
+        return super().formatMessage(record)
+
+class ColorFormatter(PresetFormatter):
     """
     A custom logging formatter that adds color to log messages based on the log level.
     The default color is set as follows:
@@ -100,23 +197,29 @@ class ColorFormatter(logging.Formatter):
         logging.CRITICAL: Fore.RED + Style.BRIGHT
 
     Attributes:
-        FMT_COLOR (dict): A dictionary mapping log levels to color codes.
+        FMT_COLOR (dict): A class-level dictionary mapping log levels to color codes, shared by all instances.
 
     Args:
         fmt (str): The format string for the log message.
         datefmt (str): The format string for the log message timestamp.
+        use_color (bool, optional): Whether to add color codes. Defaults to None, add color only when sys.stderr is a TTY,
+            so log piped to file or captured has no escape codes.
         **fmtkwargs: Additional keyword arguments to be passed to the base class constructor.
     """
 
-    def __init__(self, fmt: str, datefmt: str, **fmtkwargs):
-        self.FMT_COLOR = {
-            logging.DEBUG: Fore.GREEN,
-            logging.INFO: Fore.BLUE,
-            logging.WARNING: Fore.YELLOW,
-            logging.ERROR: Fore.RED,
-            logging.CRITICAL: Fore.RED + Style.BRIGHT,
-        }
+    FMT_COLOR = {
+        logging.DEBUG: Fore.GREEN,
+        logging.INFO: Fore.BLUE,
+        logging.WARNING: Fore.YELLOW,
+        logging.ERROR: Fore.RED,
+        logging.CRITICAL: Fore.RED + Style.BRIGHT,
+    }
+
+    def __init__(self, fmt: str, datefmt: str, use_color: bool=None, **fmtkwargs):
         super().__init__(fmt=fmt, datefmt=datefmt, **fmtkwargs)
+        if use_color is None:
+            use_color = sys.stderr.isatty()
+        self.use_color = use_color
 
     def format(self, record)->str:
         """
@@ -126,9 +229,11 @@ class ColorFormatter(logging.Formatter):
             record (logging.LogRecord): The log record to be formatted.
 
         Returns:
-            str: The formatted log message with color added.
+            str: The formatted log message with color added, or without color if not use_color.
         """
-        return self.FMT_COLOR.get(record.levelno, '') + super().format(record)
+        if self.use_color:
+            return self.FMT_COLOR.get(record.levelno, '') + super().format(record)
+        return super().format(record)
 
 class CustomLogger(logging.Logger):
     """This class is a custom logger that change info method to accept 'end' parameter to add end of line character.
@@ -142,19 +247,17 @@ class CustomLogger(logging.Logger):
         if self.isEnabledFor(logging.INFO):
             self._log(logging.INFO, msg, args, **kwargs, end=end)
 
-    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, end='\n'):
-        sinfo = None
-        if logging._srcfile:
-            if stack_info:
-                # sinfo = traceback.extract_stack()[-4]
-                fn, lno, func, sinfo = self.findCaller(stack_info)
-            else:
-                fn, lno, func = "(unknown file)", 0, "(unknown function)"
-                sinfo = None
+    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1, end='\n'):
+        # caller's file, line and function are not used by the log formats, walk the frames by findCaller() only for stack_info
+        if stack_info and logging._srcfile:
+            # sinfo = traceback.extract_stack()[-4]
+            fn, lno, func, sinfo = self.findCaller(stack_info, stacklevel)
+        else:
+            fn, lno, func, sinfo = "(unknown file)", 0, "(unknown function)", None
         if exc_info:
             if not isinstance(exc_info, tuple):
                 exc_info = sys.exc_info()
-        record = self.makeRecord(self.name, level, fn, lno, msg, args, exc_info, func, sinfo, extra)
+        record = self.makeRecord(self.name, level, fn, lno, msg, args, exc_info, func=func, extra=extra, sinfo=sinfo)
         record.end = end
         self.handle(record)
 
@@ -164,6 +267,48 @@ class CustomHandler(logging.StreamHandler):
         self.stream.write(msg + getattr(record, 'end', '\n'))
         self.flush()
 
+class BufferedFileHandler(logging.FileHandler):
+    """ FileHandler which writes utf-8 file through a block buffer, flushed for ERROR and above records only,
+        other buffered records are written out when buffer full, flush() or close() called, e.g. by logging.shutdown at exit.
+        With stream_owner, i.e. another BufferedFileHandler of the same file, writes through its stream and lock,
+        so records of both are kept in order in the file, the stream is closed by its owner only. """
+    def __init__(self, filename, mode='a', encoding='utf-8', delay=False, errors=None, buffering=8192,
+                 stream_owner:'BufferedFileHandler'=None):
+        self.buffering = buffering  # used by _open, which may be called in super().__init__
+        self._defer_flush = False
+        self._stream_owner = stream_owner
+        super().__init__(filename, mode=mode, encoding=encoding, delay=delay or stream_owner is not None, errors=errors)
+        if stream_owner is not None:
+            self.lock = stream_owner.lock
+
+    def _open(self):
+        if (owner:=self._stream_owner) is not None:
+            if owner.stream is None:
+                owner.stream = owner._open()
+            return owner.stream
+        # FileHandler keeps builtin open as _builtin_open, so file can be opened even during interpreter shutdown
+        return self._builtin_open(self.baseFilename, self.mode, buffering=self.buffering,
+                                  encoding=self.encoding, errors=self.errors)
+
+    def close(self):
+        if self._stream_owner is not None:
+            with self.lock:
+                self.flush()
+                self.stream = None  # detach, owner's stream not closed by super().close()
+        super().close()
+
+    def emit(self, record):
+        # emit is called with handler lock held, so flush() called by StreamHandler.emit sees this record's flag
+        self._defer_flush = record.levelno < logging.ERROR
+        try:
+            super().emit(record)
+        finally:
+            self._defer_flush = False
+
+    def flush(self):
+        if not self._defer_flush:
+            super().flush()
+
 if __name__ == '__main__':
     _logger = get_logger(__name__)
     _logger.debug('test')
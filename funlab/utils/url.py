@@ -1,19 +1,27 @@
 from urllib import parse
 
+def _fast_parse_qsl(qs:str)->dict[str, str]:
+    """ Same as dict(parse.parse_qsl(qs)) for default arguments, without parse_qsl's general handling and list of pairs. """
+    params = {}
+    for name_value in qs.split('&'):
+        name, _, value = name_value.partition('=')
+        if value:  # same as parse_qsl, blank values are dropped
+            params[parse.unquote_plus(name)] = parse.unquote_plus(value)
+    return params
+
 def get_request_url(request):
     if request.method == 'POST':
-        post_param = parse.unquote(request.body.decode('utf-8'))
-        url = parse.unquote(request.url + '?' + post_param)
+        url = parse.unquote(f"{request.url}?{request.body.decode('utf-8')}")
     else:
         url = parse.unquote(request.url)
     return url
 
 def get_request_post_param(request):
     if request.method == 'POST':
-        post_param = dict(parse.parse_qsl(parse.unquote(request.body.decode('utf-8'))))
+        post_param = _fast_parse_qsl(request.body.decode('utf-8'))  # unquotes each name and value
     else:
-        post_param = dict(parse.parse_qsl(parse.urlsplit(request.url).query))
+        post_param = _fast_parse_qsl(parse.urlsplit(request.url).query)
     return post_param
 
 def get_request_post_param_by_url(url):
-    return dict(parse.parse_qsl(parse.urlsplit(url).query))
\ No newline at end of file
+    return _fast_parse_qsl(parse.urlsplit(url).query)
\ No newline at end of file
@@ -1,26 +1,48 @@
 import argparse
+import functools
+import logging
 import os
 import sys
-from pathlib import Path
 import tomllib
 from cryptography.fernet import Fernet, InvalidToken
 import re
+import secrets
 
+from funlab.utils import log
+
+mylogger = log.get_logger(__name__, level=logging.WARNING)
+
+_ENV_NAME_RE = re.compile(r'[^a-zA-Z0-9_]')
+# base64 of every Fernet token starts with version byte 0x80 and timestamp high bytes 0,
+# shortest token is 73 bytes: version(1)+timestamp(8)+iv(16)+one aes block(16)+hmac(32)
+_TOKEN_PREFIX = b'gAAAAA'
+_MIN_TOKEN_LEN = 100
+# bytes view of os.environ on posix, token bytes set and got as is without str round-trip; None on Windows
+_environb = os.environb if os.supports_bytes_environ else None
+_token_environ = os.environ if _environb is None else _environb
+
+@functools.lru_cache(maxsize=128)
 def validate_env_name(key_name, default_name='DEFAULT'):
-    key_name = re.sub('[^a-zA-Z0-9_]', '', key_name)
+    key_name = _ENV_NAME_RE.sub('', key_name)
     if key_name and key_name[0].isdigit():
         key_name = '_' + key_name
     if not key_name:
         return default_name
     return key_name
 
+@functools.lru_cache(maxsize=32)
+def _fernet_for(key:str)->Fernet:
+    # keyed by the key itself, so a key regenerated under the same env name never gets the stale Fernet
+    return Fernet(key.encode())
+
 def generate_key(key_name:str=None):
     """
     This function generates a key and saves it into environment variable named 'key_name'
     """
     if not key_name:
-        key_name = Fernet.generate_key().decode()
-    key_name=validate_env_name(key_name)  # illegal char for env name
+        key_name = 'FKEY_' + secrets.token_hex(8)  # already legal env name
+    else:
+        key_name=validate_env_name(key_name)  # illegal char for env name
     key = Fernet.generate_key().decode()
     try:
         os.environ[key_name] = key
@@ -28,7 +50,7 @@ def generate_key(key_name:str=None):
         # print(f'Key Name = {key_name}, key={key}')
         return key_name
     except Exception as e:
-        print('Set environ failed! Eception:'+ str(e))
+        mylogger.error('Set environ failed! Exception:%s', e)
         raise e
 
 def encrypt_var_into_env(var_name:str, var_value: str, key_name: str)->str:
@@ -45,11 +67,16 @@ def encrypt_var_into_env(var_name:str, var_value: str, key_name: str)->str:
     # print(f'{var_name} = {var_value}')
     key_name=validate_env_name(key_name)  # illegal char for env name
     key = os.environ.get(key_name, None)
-    encrypted_value = var_value.encode()
-    f = Fernet(key.encode())
-    encrypted_value = f.encrypt(encrypted_value).decode()
-    os.environ[var_name] = encrypted_value
-    return encrypted_value
+    env_name, token = _encrypted_env_item(_fernet_for(key), var_name, var_value)
+    _token_environ[env_name] = token
+    return os.fsdecode(token)
+
+def _encrypted_env_item(f:Fernet, var_name:str, var_value:str)->tuple[str|bytes, str|bytes]:
+    # (name, token) to set into _token_environ, bytes on posix, str on Windows
+    token = f.encrypt(var_value.encode())
+    if _environb is None:
+        return var_name, token.decode()
+    return os.fsencode(var_name), token
 
 def get_env_var_value(var_name:str, key_name: str):
     """
@@ -57,29 +84,38 @@ def get_env_var_value(var_name:str, key_name: str):
     """
     key_name=validate_env_name(key_name)  # illegal char for env name
     if not (key:=os.environ.get(key_name, None)):
-        print(f"Warning:Can't get {key_name}'s key in environment varables, just retirm the raw one.")
-        return os.environ[var_name].decode()
-    f = Fernet(key.encode())
+        mylogger.warning("Can't get %s's key in environment varables, just return the raw one.", key_name)
+        return os.environ[var_name]
+    value = os.environ[var_name].encode() if _environb is None else _environb[os.fsencode(var_name)]
+    if len(value) < _MIN_TOKEN_LEN or not value.startswith(_TOKEN_PREFIX):  # can't be a token, skip decrypt try
+        mylogger.warning("%s's value is not encrypted, just return the raw one.", var_name)
+        return os.fsdecode(value)
+    f = _fernet_for(key)
     try:
-        decrypted_var = f.decrypt(os.environ[var_name].encode())
+        decrypted_var = f.decrypt(value)
     except InvalidToken:
-        print(f"Warning:{var_name}'s value is not encrypted, just retunr the raw one.")
-        return os.environ[var_name].decode()
+        mylogger.warning("%s's value is not encrypted, just return the raw one.", var_name)
+        return os.fsdecode(value)
     return decrypted_var.decode()
 
 def encode_envfile_vars(env_file, key_name:str=None):
-    if Path(env_file).exists():
+    try:
         with open(env_file, "rb") as f:
             vars = tomllib.load(f)
-    else:
+    except FileNotFoundError:
         raise Exception(f'Not found .env file:{env_file}, check!')
-    key_name = generate_key(key_name)
-    for var_name, var_value in vars.items():
+    key_name = generate_key(key_name)  # returns validated name
+    f = _fernet_for(os.environ[key_name])  # resolve key once for all vars
+    encrypted_vars = {}
+    for var_name in list(vars):
+        var_value = vars.pop(var_name)  # drop the plain value once consumed
         if isinstance(var_value, str):
-            encrypted = encrypt_var_into_env(var_name=var_name, var_value=var_value, key_name=key_name)
+            env_name, token = _encrypted_env_item(f, var_name, var_value)
+            encrypted_vars[env_name] = token
             # print(f'{var_name} is encryped') # : {encrypted}')
         else:
             raise Exception(f'Variable value only support string value, quote with "" or '', check:{var_name}')
+    _token_environ.update(encrypted_vars)  # set all at once, none set if any var invalid
     return key_name
 
 def main(args=None):
@@ -88,15 +124,14 @@ def main(args=None):
     parser = argparse.ArgumentParser(description="Encoding .env file for application's environment var_value protection. Programing by 013 ...")
     parser.add_argument("-e", "--envfile", dest="envfile", help="specify .env file name and path")
     parser.add_argument("-k", "--keyname", dest="keyname", default='', help="specify the keyname and use it to save the key into environment varable.")
+    parser.add_argument("-y", "--yes", action="store_true", dest="assume_yes", help="do not wait for Enter to continue.")
     args = parser.parse_args(args)
     print(f"This program will encoding variables value into OS. environment for application's sensitive data.")
-    input("Press Enter to continue...")
+    if not args.assume_yes and sys.stdin.isatty():  # never block non-interactive runs, e.g. pipe, cron
+        input("Press Enter to continue...")
     print(f'Encoding file: {args.envfile}')
     keyname = encode_envfile_vars(args.envfile, args.keyname)
     print(f"Encoding done, and use key:'{keyname}'' to get the value.")
 
 if __name__ == "__main__":
-    # FLASK SECRET_KEY = 'cd81683f98378019ff1996c16971f7eb32256ea3cad5e6cf'
-    args = None
-    args= ['-e', '.env', '-k', 'cd81683f98378019ff1996c16971f7eb32256ea3cad5e6cf']
-    main(args)
\ No newline at end of file
+    main()
\ No newline at end of file